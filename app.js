@@ -4,25 +4,67 @@ const bodyParser = require('body-parser');
 const app = express();
 const db = new sqlite3.Database(':memory:');
 
+// Запросы компилируются один раз, а не на каждый HTTP-запрос
+let selectRecords;
+let insertRecord;
+
 db.serialize(() => {
   db.run("CREATE TABLE records (id INTEGER PRIMARY KEY, name TEXT, phone TEXT)");
+  // id — это rowid: выборка "id > ?" идёт по диапазону B-дерева, а ORDER BY
+  // бесплатно гарантирует возрастание id, на которое опирается клиент
+  selectRecords = db.prepare("SELECT * FROM records WHERE id > ? ORDER BY id");
+  insertRecord = db.prepare("INSERT INTO records (name, phone) VALUES (?, ?)");
 });
 
-app.use(bodyParser.json());
+// Сериализованный список записей; сбрасывается при каждой вставке.
+// Версия не даёт запросу, начатому до вставки, сохранить устаревший кэш.
+let recordsJson = null;
+let recordsVersion = 0;
+
+// Запись — это два коротких поля; большие тела отклоняются до разбора
+app.use(bodyParser.json({ limit: '10kb' }));
 app.use(express.static('public'));
 
 app.get('/api/records', (req, res) => {
-  db.all("SELECT * FROM records", [], (err, rows) => {
-    res.json(rows);
+  const sinceId = parseInt(req.query.since_id, 10) || 0;
+  if (sinceId === 0 && recordsJson !== null) {
+    return res.type('json').send(recordsJson);
+  }
+  const version = recordsVersion;
+  selectRecords.all([sinceId], (err, rows) => {
+    if (err) return res.status(500).json({ error: 'Ошибка базы данных' });
+    const json = JSON.stringify(rows);
+    if (sinceId === 0 && version === recordsVersion) recordsJson = json;
+    res.type('json').send(json);
   });
 });
 
 app.post('/api/records', (req, res) => {
-  const { name, phone } = req.body;
-  db.run("INSERT INTO records (name, phone) VALUES (?, ?)", [name, phone], function() {
+  const { name, phone } = req.body || {};
+  if (typeof name !== 'string' || typeof phone !== 'string') {
+    return res.status(400).json({ error: 'Нужны строковые поля name и phone' });
+  }
+  insertRecord.run([name, phone], function(err) {
+    if (err) return res.status(500).json({ error: 'Ошибка базы данных' });
+    recordsJson = null;
+    recordsVersion++;
     res.json({ id: this.lastID, name, phone });
   });
 });
 
+// Ошибки body-parser (413, 400, 415) отдаём в том же JSON-виде, что и обработчики
+const bodyErrors = {
+  'entity.too.large': 'Слишком большое тело запроса',
+  'entity.parse.failed': 'Некорректный JSON',
+};
+
+app.use((err, req, res, next) => {
+  if (res.headersSent) return next(err);
+  const status = err.status || err.statusCode || 500;
+  const error = bodyErrors[err.type] || (status < 500 ? 'Некорректный запрос' : 'Ошибка сервера');
+  res.status(status).json({ error });
+});
+
 const PORT = process.env.PORT || 3000;
-app.listen(PORT, () => console.log(`Сервер запущен на порту ${PORT}`));
+// Очередь ожидающих соединений длиннее стандартной (511) для всплесков подключений
+app.listen({ port: PORT, backlog: 1024 }, () => console.log(`Сервер запущен на порту ${PORT}`));